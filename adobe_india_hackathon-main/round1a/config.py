@@ -5,45 +5,82 @@ Contains all configuration parameters and settings for the PDF outline extractio
 
 import os
 from pathlib import Path
+from typing import Any, Callable
+
+
+class _EnvSetting:
+    """
+    Class attribute parsed from the environment on first access.
+    
+    The parsed value replaces the descriptor on the owning class, so later
+    reads are plain attribute lookups and assignments such as
+    ``Config.INPUT_DIR = ...`` override it as before.
+    """
+    
+    def __init__(self, env_var: str, default: str, parse: Callable[[str], Any] = str):
+        self.env_var = env_var
+        self.default = default
+        self.parse = parse
+        self.name = env_var
+    
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+    
+    def __get__(self, instance: Any, owner: type) -> Any:
+        value = self.parse(os.getenv(self.env_var, self.default))
+        setattr(owner, self.name, value)
+        return value
 
 
 class Config:
     """Configuration class containing all system parameters."""
     
+    # Environment-backed settings are parsed lazily on first access
+    
     # Directory paths - use local directories in development
-    INPUT_DIR = os.getenv('INPUT_DIR', './input')
-    OUTPUT_DIR = os.getenv('OUTPUT_DIR', './output')
+    INPUT_DIR = _EnvSetting('INPUT_DIR', './input')
+    OUTPUT_DIR = _EnvSetting('OUTPUT_DIR', './output')
     
     # Performance constraints
-    MAX_PROCESSING_TIME = int(os.getenv('MAX_PROCESSING_TIME', '10'))  # seconds
-    MAX_FILE_SIZE = int(os.getenv('MAX_FILE_SIZE', '50')) * 1024 * 1024  # 50MB in bytes
+    MAX_PROCESSING_TIME = _EnvSetting('MAX_PROCESSING_TIME', '10', int)  # seconds
+    MAX_FILE_SIZE = _EnvSetting('MAX_FILE_SIZE', '50', lambda v: int(v) * 1024 * 1024)  # 50MB in bytes
+    MAX_JOBS = _EnvSetting('MAX_JOBS', '0', int)  # Parallel PDF workers; 0 uses one per CPU
     
     # PDF processing parameters
-    MAX_PAGES = int(os.getenv('MAX_PAGES', '50'))
-    MIN_TEXT_LENGTH = int(os.getenv('MIN_TEXT_LENGTH', '100'))  # Minimum text for native extraction
-    MIN_TEXT_BLOCKS = int(os.getenv('MIN_TEXT_BLOCKS', '10'))   # Minimum blocks for native extraction
+    MAX_PAGES = _EnvSetting('MAX_PAGES', '50', int)
+    MIN_TEXT_LENGTH = _EnvSetting('MIN_TEXT_LENGTH', '100', int)  # Minimum text for native extraction
+    MIN_TEXT_BLOCKS = _EnvSetting('MIN_TEXT_BLOCKS', '10', int)   # Minimum blocks for native extraction
+    FITZ_STORE_TRIM_PAGES = _EnvSetting('FITZ_STORE_TRIM_PAGES', '32', int)  # Empty PyMuPDF's store every N pages; 0 never
     
     # Title extraction parameters
-    MAX_TITLE_LENGTH = int(os.getenv('MAX_TITLE_LENGTH', '200'))
+    MAX_TITLE_LENGTH = _EnvSetting('MAX_TITLE_LENGTH', '200', int)
     
     # Heading detection parameters
-    MIN_HEADING_SCORE = int(os.getenv('MIN_HEADING_SCORE', '2'))
-    MAX_HEADING_LENGTH = int(os.getenv('MAX_HEADING_LENGTH', '200'))
+    MIN_HEADING_SCORE = _EnvSetting('MIN_HEADING_SCORE', '2', int)
+    MAX_HEADING_LENGTH = _EnvSetting('MAX_HEADING_LENGTH', '200', int)
     
     # Font size thresholds (can be overridden by document analysis)
-    DEFAULT_H1_FONT_SIZE = float(os.getenv('DEFAULT_H1_FONT_SIZE', '16.0'))
-    DEFAULT_H2_FONT_SIZE = float(os.getenv('DEFAULT_H2_FONT_SIZE', '14.0'))
-    DEFAULT_H3_FONT_SIZE = float(os.getenv('DEFAULT_H3_FONT_SIZE', '12.0'))
+    DEFAULT_H1_FONT_SIZE = _EnvSetting('DEFAULT_H1_FONT_SIZE', '16.0', float)
+    DEFAULT_H2_FONT_SIZE = _EnvSetting('DEFAULT_H2_FONT_SIZE', '14.0', float)
+    DEFAULT_H3_FONT_SIZE = _EnvSetting('DEFAULT_H3_FONT_SIZE', '12.0', float)
     
     # OCR parameters
-    OCR_CONFIDENCE_THRESHOLD = int(os.getenv('OCR_CONFIDENCE_THRESHOLD', '30'))
-    OCR_DPI = int(os.getenv('OCR_DPI', '200'))
+    OCR_CONFIDENCE_THRESHOLD = _EnvSetting('OCR_CONFIDENCE_THRESHOLD', '30', int)
+    OCR_DPI = _EnvSetting('OCR_DPI', '200', int)
+    OCR_DPI_ZOOM = _EnvSetting('OCR_DPI_ZOOM', '2.0', float)  # Rasterization zoom for OCR pages
+    OCR_FAST_ZOOM = _EnvSetting('OCR_FAST_ZOOM', '1.0', float)  # First-pass zoom; 0 disables escalation
+    OCR_CONFIDENCE_HIGH = _EnvSetting('OCR_CONFIDENCE_HIGH', '80', int)  # Accept first pass at this mean confidence
+    OCR_COLORSPACE = _EnvSetting('OCR_COLORSPACE', 'gray', str.lower)  # 'gray' or 'rgb'
+    OCR_HIGH_QUALITY = _EnvSetting('OCR_HIGH_QUALITY', 'false',
+                                   lambda v: v.lower() in ('1', 'true', 'yes'))  # 2x RGB rasters
+    OCR_WORKERS = _EnvSetting('OCR_WORKERS', '0', int)  # OCR processes per PDF; 0 uses one per 4 CPUs
+    OCR_CACHE_DIR = _EnvSetting('OCR_CACHE_DIR', '')  # Empty disables the OCR result cache
     
     # Logging configuration
-    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_LEVEL = _EnvSetting('LOG_LEVEL', 'INFO')
     
     # Language support
-    SUPPORTED_LANGUAGES = os.getenv('SUPPORTED_LANGUAGES', 'eng').split(',')
+    SUPPORTED_LANGUAGES = _EnvSetting('SUPPORTED_LANGUAGES', 'eng', lambda v: v.split(','))
     
     @classmethod
     def validate_directories(cls) -> bool:
@@ -69,6 +106,7 @@ class Config:
         print(f"  Output Directory: {cls.OUTPUT_DIR}")
         print(f"  Max Processing Time: {cls.MAX_PROCESSING_TIME}s")
         print(f"  Max Pages: {cls.MAX_PAGES}")
+        print(f"  Max Jobs: {cls.MAX_JOBS or os.cpu_count() or 1}")
         print(f"  OCR Confidence Threshold: {cls.OCR_CONFIDENCE_THRESHOLD}")
         print(f"  Supported Languages: {cls.SUPPORTED_LANGUAGES}")
         print(f"  Log Level: {cls.LOG_LEVEL}")
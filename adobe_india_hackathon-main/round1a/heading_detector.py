@@ -6,11 +6,139 @@ Implements multi-criteria heading detection and hierarchy assignment.
 import re
 from typing import Dict, List, Any, Optional, Tuple
 import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import chain
+from operator import itemgetter
+
+import numpy as np
 
 from config import Config
 
 logger = logging.getLogger(__name__)
 
+# Heading patterns, compiled once at import time.
+# Numbered, lettered and roman prefixes share one alternation; the
+# matching group name selects the pattern. A lone I/V/X is both a
+# letter and a roman numeral, so it gets its own group.
+_RE_PREFIX = re.compile(
+    r'^(?:(?P<numbered>\d+(?:\.\d+){0,2})\.?'
+    r'|(?P<roman_letter>[IVX])\.?'
+    r'|(?P<roman>[IVX]+)\.?'
+    r'|(?P<lettered>[A-Z])\.?'
+    r'|(?P<lower_lettered>[a-z])[\)\.]?'
+    r')\s'
+)
+_GROUP_TO_TAGS = {
+    'roman_letter': ('lettered', 'roman'),
+    'roman': ('roman',),
+    'lettered': ('lettered',),
+    'lower_lettered': ('lower_lettered',),
+}
+_NUMBERED_DEPTH_PATTERNS = ('numbered', 'sub_numbered', 'sub_sub_numbered')
+_RE_SECTION = re.compile(r'^(Chapter|Section|Part|Appendix)\s+', re.IGNORECASE)
+
+# Pattern-driven levels, checked in order before font size is considered.
+# Plain 'numbered' text carries no level of its own; font size decides it.
+_PATTERN_LEVEL = {'sub_numbered': 'H2', 'sub_sub_numbered': 'H3', 'section_marker': 'H1'}
+_LEVEL_PATTERNS = ('sub_numbered', 'sub_sub_numbered', 'section_marker')
+
+# Font size tier to heading level
+_TIER_LEVEL = (None, 'H3', 'H2', 'H1')
+
+
+@lru_cache(maxsize=4096)
+def _check_text_patterns_cached(text: str) -> Tuple[str, ...]:
+    """Check text for heading patterns; cached since heading strings repeat across pages."""
+    if not text:
+        return ()
+
+    patterns = []
+    c0 = text[0]
+
+    # Numbered, lettered and roman prefixes: one regex dispatch
+    if c0.isalnum():
+        match = _RE_PREFIX.match(text)
+        if match:
+            group = match.lastgroup
+            if group == 'numbered':
+                depth = match.group('numbered').count('.')
+                patterns.append(_NUMBERED_DEPTH_PATTERNS[depth])
+            else:
+                patterns.extend(_GROUP_TO_TAGS[group])
+
+    # Formatting patterns
+    # A bounded split stops after nine words instead of splitting the whole text
+    if text.isupper() and len(text.split(None, 8)) <= 8:
+        patterns.append('all_caps')
+    if text.istitle():
+        patterns.append('title_case')
+
+    # Special markers
+    if _RE_SECTION.match(text):
+        patterns.append('section_marker')
+
+    return tuple(patterns)
+
+
+# (patterns, is_bold, is_italic, score before position scoring)
+BlockFeatures = Tuple[Tuple[str, ...], bool, bool, int]
+# Document-level cache keyed by (text, font size, flags)
+BlockCache = Dict[Tuple[str, float, int], BlockFeatures]
+
+
+def _block_features(text: str, font_size: float, flags: int) -> BlockFeatures:
+    """Compute the position-independent heading features of a text block."""
+    # Style analysis
+    is_bold = (flags & 16) != 0
+    is_italic = (flags & 2) != 0
+
+    # Pattern matching
+    patterns = _check_text_patterns_cached(text)
+
+    # Calculate initial score
+    score = 0
+    if is_bold:
+        score += 2
+    if font_size > 12:
+        score += 1
+    if patterns:
+        score += len(patterns)
+
+    # Length scoring (reasonable heading length)
+    if 5 <= len(text) <= 80:
+        score += 1
+
+    return patterns, is_bold, is_italic, score
+
+
+def _pattern_heading_level(patterns: Tuple[str, ...]) -> Optional[str]:
+    """Determine the heading level implied by text patterns, if any."""
+    for pattern in _LEVEL_PATTERNS:
+        if pattern in patterns:
+            return _PATTERN_LEVEL[pattern]
+    return None
+
+
+@dataclass
+class Candidate:
+    """A text block that scored high enough to be a heading candidate."""
+    
+    __slots__ = (
+        'text', 'page', 'score', 'font_size', 'is_bold', 'is_italic',
+        'left_margin', 'position', 'patterns'
+    )
+    
+    text: str
+    page: int
+    score: int
+    font_size: float
+    is_bold: bool
+    is_italic: bool
+    left_margin: float
+    position: float
+    patterns: Tuple[str, ...]
+
 
 class HeadingDetector:
     """Detects and classifies headings using multiple criteria."""
@@ -28,12 +156,13 @@ class HeadingDetector:
         Returns:
             List of heading dictionaries with level, text, and page number
         """
-        all_candidates = []
-        
-        # Collect heading candidates from all pages
-        for page in pages:
-            page_candidates = self._find_heading_candidates(page)
-            all_candidates.extend(page_candidates)
+        # Collect heading candidates from all pages. Running headers and
+        # footers repeat on every page, so block features are cached at
+        # document level and shared across pages.
+        block_cache: BlockCache = {}
+        all_candidates = list(chain.from_iterable(
+            self._find_heading_candidates(page, block_cache) for page in pages
+        ))
         
         if not all_candidates:
             return []
@@ -45,127 +174,86 @@ class HeadingDetector:
         classified_headings = self._classify_headings(all_candidates, font_analysis)
         
         # Sort by page number and position
-        classified_headings.sort(key=lambda x: (x['page'], x.get('position', 0)))
+        classified_headings.sort(key=itemgetter('page', 'position'))
         
         return classified_headings
     
-    def _find_heading_candidates(self, page: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def _find_heading_candidates(self, page: Dict[str, Any],
+                                 block_cache: Optional[BlockCache] = None) -> List[Candidate]:
         """Find potential heading candidates on a single page."""
         text_blocks = page.get('text_blocks', [])
         page_number = page.get('page_number', 1)
+        if block_cache is None:
+            block_cache = {}
         
         candidates = []
+        max_length = self.config.MAX_HEADING_LENGTH
+        min_score = self.config.MIN_HEADING_SCORE
         
         for block in text_blocks:
-            text = block.get('text', '').strip()
-            if not text or len(text) < 2:
-                continue
-            
-            # Skip very long text (likely body text)
-            if len(text) > self.config.MAX_HEADING_LENGTH:
+            # Cheap length gate first; skip very long text (likely body text)
+            text = block.text.strip()
+            if len(text) < 2 or len(text) > max_length:
                 continue
             
-            score = 0
-            features = {}
-            
-            # Font size analysis
-            font_size = block.get('size', 0)
-            features['font_size'] = font_size
-            
-            # Style analysis
-            flags = block.get('flags', 0)
-            is_bold = (flags & 16) != 0
-            is_italic = (flags & 2) != 0
-            features['is_bold'] = is_bold
-            features['is_italic'] = is_italic
-            
-            # Position analysis
-            bbox = block.get('bbox', [0, 0, 0, 0])
-            features['left_margin'] = bbox[0]
-            features['top_position'] = bbox[1]
-            features['position'] = bbox[1]
+            font_size = block.size
+            flags = block.flags
             
-            # Pattern matching
-            patterns_matched = self._check_text_patterns(text)
-            features['patterns'] = patterns_matched
-            
-            # Calculate initial score
-            if is_bold:
-                score += 2
-            if font_size > 12:
-                score += 1
-            if patterns_matched:
-                score += len(patterns_matched)
+            # Text and style features only depend on (text, size, flags)
+            key = (text, font_size, flags)
+            features = block_cache.get(key)
+            if features is None:
+                features = _block_features(text, font_size, flags)
+                block_cache[key] = features
+            patterns_matched, is_bold, is_italic, score = features
             
             # Position scoring (left-aligned headings)
+            bbox = block.bbox
             if bbox[0] < 100:  # Near left margin
                 score += 1
             
-            # Length scoring (reasonable heading length)
-            if 5 <= len(text) <= 80:
-                score += 1
-            
-            if score >= self.config.MIN_HEADING_SCORE:
-                candidate = {
-                    'text': text,
-                    'page': page_number,
-                    'score': score,
-                    'features': features
-                }
-                candidates.append(candidate)
+            if score >= min_score:
+                candidates.append(Candidate(
+                    text=text,
+                    page=page_number,
+                    score=score,
+                    font_size=font_size,
+                    is_bold=is_bold,
+                    is_italic=is_italic,
+                    left_margin=bbox[0],
+                    position=bbox[1],
+                    patterns=patterns_matched
+                ))
         
         return candidates
     
     def _check_text_patterns(self, text: str) -> List[str]:
         """Check text for heading patterns."""
-        patterns = []
-        
-        # Numbered patterns
-        if re.match(r'^\d+\.?\s+', text):
-            patterns.append('numbered')
-        if re.match(r'^\d+\.\d+\.?\s+', text):
-            patterns.append('sub_numbered')
-        if re.match(r'^\d+\.\d+\.\d+\.?\s+', text):
-            patterns.append('sub_sub_numbered')
-        
-        # Lettered patterns
-        if re.match(r'^[A-Z]\.?\s+', text):
-            patterns.append('lettered')
-        if re.match(r'^[a-z][\)\.]?\s+', text):
-            patterns.append('lower_lettered')
-        
-        # Formatting patterns
-        if text.isupper() and len(text.split()) <= 8:
-            patterns.append('all_caps')
-        if text.istitle():
-            patterns.append('title_case')
-        
-        # Roman numerals
-        if re.match(r'^[IVX]+\.?\s+', text):
-            patterns.append('roman')
-        
-        # Special markers
-        if re.match(r'^(Chapter|Section|Part|Appendix)\s+', text, re.IGNORECASE):
-            patterns.append('section_marker')
-        
-        return patterns
+        return list(_check_text_patterns_cached(text))
     
-    def _analyze_font_sizes(self, candidates: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _analyze_font_sizes(self, candidates: List[Candidate]) -> Dict[str, Any]:
         """Analyze font size distribution to establish hierarchy thresholds."""
-        font_sizes = [c['features']['font_size'] for c in candidates if c['features']['font_size'] > 0]
+        font_sizes = np.fromiter(
+            (c.font_size for c in candidates if c.font_size > 0),
+            dtype=np.float64
+        )
         
-        if not font_sizes:
+        if font_sizes.size == 0:
             return {'h1_threshold': 16, 'h2_threshold': 14, 'h3_threshold': 12}
         
-        font_sizes.sort(reverse=True)
-        unique_sizes = sorted(list(set(font_sizes)), reverse=True)
+        # np.unique sorts ascending in one pass; reverse for largest-first
+        unique_sizes = np.unique(font_sizes)[::-1].tolist()
+        
+        # Median of the descending order, selected without a full sort
+        median_index = font_sizes.size - 1 - font_sizes.size // 2
+        median_size = float(np.partition(font_sizes, median_index)[median_index])
         
         analysis = {
             'all_sizes': font_sizes,
             'unique_sizes': unique_sizes,
-            'max_size': max(font_sizes),
-            'min_size': min(font_sizes),
-            'median_size': font_sizes[len(font_sizes) // 2]
+            'max_size': unique_sizes[0],
+            'min_size': unique_sizes[-1],
+            'median_size': median_size
         }
         
         # Establish thresholds based on distribution
@@ -186,81 +274,49 @@ class HeadingDetector:
         
         return analysis
     
-    def _classify_headings(self, candidates: List[Dict[str, Any]], font_analysis: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def _classify_headings(self, candidates: List[Candidate], font_analysis: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Classify headings into H1, H2, H3 levels."""
-        classified = []
+        if not candidates:
+            return []
         
         h1_threshold = font_analysis.get('h1_threshold', 16)
         h2_threshold = font_analysis.get('h2_threshold', 14)
         h3_threshold = font_analysis.get('h3_threshold', 12)
         
-        for candidate in candidates:
-            features = candidate['features']
-            font_size = features['font_size']
-            patterns = features['patterns']
-            
-            # Determine level based on multiple criteria
-            level = self._determine_heading_level(
-                font_size, patterns, features, 
-                h1_threshold, h2_threshold, h3_threshold
-            )
+        # Flatten the candidate fields into columns
+        count = len(candidates)
+        font_sizes = np.fromiter((c.font_size for c in candidates), dtype=np.float64, count=count)
+        is_bold = np.fromiter((c.is_bold for c in candidates), dtype=bool, count=count)
+        all_caps = np.fromiter(('all_caps' in c.patterns for c in candidates), dtype=bool, count=count)
+        
+        # Font size-based classification: 3 = H1, 2 = H2, 1 = H3, 0 = too small
+        tiers = np.select(
+            [font_sizes >= h1_threshold, font_sizes >= h2_threshold, font_sizes >= h3_threshold],
+            [3, 2, 1],
+            0
+        )
+        
+        # Non-bold text gets demoted one level
+        tiers -= ~is_bold
+        
+        # All caps likely H1 or H2
+        tiers[(tiers == 1) & all_caps] = 2
+        
+        classified = []
+        
+        for candidate, tier in zip(candidates, tiers.tolist()):
+            # Pattern-based classification takes priority over font size
+            level = _pattern_heading_level(candidate.patterns) if candidate.patterns else None
+            if level is None and tier > 0:
+                level = _TIER_LEVEL[tier]
             
             if level:
                 heading = {
                     'level': level,
-                    'text': candidate['text'],
-                    'page': candidate['page'],
-                    'position': features.get('position', 0)
+                    'text': candidate.text,
+                    'page': candidate.page,
+                    'position': candidate.position
                 }
                 classified.append(heading)
         
         return classified
-    
-    def _determine_heading_level(self, font_size: float, patterns: List[str], 
-                                features: Dict[str, Any], h1_thresh: float, 
-                                h2_thresh: float, h3_thresh: float) -> Optional[str]:
-        """Determine the heading level using multiple criteria."""
-        
-        # Pattern-based classification (highest priority)
-        if 'numbered' in patterns:
-            if re.match(r'^\d+\.?\s+', features.get('text', '')):
-                return 'H1'
-        if 'sub_numbered' in patterns:
-            return 'H2'
-        if 'sub_sub_numbered' in patterns:
-            return 'H3'
-        
-        # Section markers
-        if 'section_marker' in patterns:
-            return 'H1'
-        
-        # Font size-based classification
-        if font_size >= h1_thresh:
-            base_level = 'H1'
-        elif font_size >= h2_thresh:
-            base_level = 'H2'
-        elif font_size >= h3_thresh:
-            base_level = 'H3'
-        else:
-            return None  # Too small to be a heading
-        
-        # Adjust based on styling
-        if features.get('is_bold', False):
-            # Bold text gets priority
-            pass
-        else:
-            # Non-bold text gets demoted one level
-            if base_level == 'H1':
-                base_level = 'H2'
-            elif base_level == 'H2':
-                base_level = 'H3'
-            elif base_level == 'H3':
-                return None
-        
-        # Special pattern adjustments
-        if 'all_caps' in patterns and len(features.get('text', '')) < 50:
-            # All caps likely H1 or H2
-            if base_level == 'H3':
-                base_level = 'H2'
-        
-        return base_level
@@ -4,12 +4,45 @@ Handles structured JSON output generation for extracted outlines.
 """
 
 import json
+import os
+import re
 from pathlib import Path
 from typing import Dict, List, Any
 import logging
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# Matches any whitespace that ' '.join(text.split()) would change
+_WS_RE = re.compile(r'\s{2,}|^\s|\s$|[^\S ]')
+
+
+def _normalize_whitespace(text: str) -> str:
+    """Collapse whitespace runs, skipping the split/join when already clean."""
+    if not _WS_RE.search(text):
+        return text
+    return ' '.join(text.split())
+
+
+def _write_json(data: Any, path: Path) -> None:
+    """Write data as indented UTF-8 JSON in a single write, using orjson when available."""
+    if ORJSON_AVAILABLE:
+        payload = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    else:
+        payload = json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+    path.write_bytes(payload)
+
 
 class JSONGenerator:
     """Generates structured JSON output for PDF outlines."""
@@ -33,13 +66,12 @@ class JSONGenerator:
             cleaned_data = self._validate_and_clean(outline_data)
             
             # Write JSON file
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(cleaned_data, f, indent=2, ensure_ascii=False)
+            _write_json(cleaned_data, output_path)
             
-            logger.info(f"Outline saved to {output_path}")
+            logger.info("Outline saved to %s", output_path)
             
         except Exception as e:
-            logger.error(f"Error saving outline to {output_path}: {str(e)}")
+            logger.error("Error saving outline to %s: %s", output_path, e)
             raise
     
     def _validate_and_clean(self, data: Dict[str, Any]) -> Dict[str, Any]:
@@ -63,7 +95,7 @@ class JSONGenerator:
             return 'Untitled Document'
         
         # Clean whitespace and normalize
-        title = ' '.join(str(title).split())
+        title = _normalize_whitespace(title)
         
         # Ensure reasonable length
         if len(title) > 200:
@@ -103,7 +135,9 @@ class JSONGenerator:
                 continue
             
             # Clean text
-            clean_text = ' '.join(str(text).split())
+            if not isinstance(text, str):
+                text = str(text)
+            clean_text = _normalize_whitespace(text)
             if not clean_text:
                 continue
             
@@ -121,10 +155,59 @@ class JSONGenerator:
         
         return cleaned_outline
     
+    def _read_outline_stats(self, json_file: Path) -> Dict[str, Any]:
+        """
+        Read title, heading counts and error flag from an outline JSON file.
+        
+        Streams the file with ijson when available so the outline list is
+        never materialized; otherwise falls back to json.load.
+        """
+        title = 'Unknown'
+        file_headings = 0
+        level_counts = {'H1': 0, 'H2': 0, 'H3': 0}
+        has_error = False
+        
+        if IJSON_AVAILABLE:
+            with open(json_file, 'rb') as f:
+                for prefix, event, value in ijson.parse(f):
+                    if prefix == 'outline.item' and event == 'start_map':
+                        file_headings += 1
+                    elif prefix == 'outline.item.level':
+                        if value in level_counts:
+                            level_counts[value] += 1
+                    elif prefix == 'title' and event == 'string':
+                        title = value
+                    elif prefix == 'error':
+                        has_error = True
+        else:
+            with open(json_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            
+            outline = data.get('outline', [])
+            file_headings = len(outline)
+            for heading in outline:
+                level = heading.get('level')
+                if level in level_counts:
+                    level_counts[level] += 1
+            
+            title = data.get('title', 'Unknown')
+            has_error = 'error' in data
+        
+        return {
+            'title': title,
+            'total_headings': file_headings,
+            'heading_levels': level_counts,
+            'has_error': has_error
+        }
+    
     def generate_summary_report(self, output_dir: Path) -> None:
         """Generate a summary report of all processed files."""
         try:
-            json_files = list(output_dir.glob("*.json"))
+            with os.scandir(output_dir) as entries:
+                json_files = [
+                    Path(entry.path) for entry in entries
+                    if entry.name.endswith('.json') and entry.is_file()
+                ]
             
             summary = {
                 'total_files_processed': len(json_files),
@@ -140,33 +223,19 @@ class JSONGenerator:
             
             for json_file in json_files:
                 try:
-                    with open(json_file, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
+                    stats = self._read_outline_stats(json_file)
+                    total_headings += stats['total_headings']
                     
-                    outline = data.get('outline', [])
-                    file_headings = len(outline)
-                    total_headings += file_headings
+                    for level, count in stats['heading_levels'].items():
+                        summary['statistics']['heading_levels'][level] += count
                     
-                    # Count heading levels
-                    level_counts = {'H1': 0, 'H2': 0, 'H3': 0}
-                    for heading in outline:
-                        level = heading.get('level')
-                        if level in level_counts:
-                            level_counts[level] += 1
-                            summary['statistics']['heading_levels'][level] += 1
-                    
-                    file_info = {
-                        'filename': json_file.name,
-                        'title': data.get('title', 'Unknown'),
-                        'total_headings': file_headings,
-                        'heading_levels': level_counts,
-                        'has_error': 'error' in data
-                    }
+                    file_info = {'filename': json_file.name}
+                    file_info.update(stats)
                     
                     summary['files'].append(file_info)
                     
                 except Exception as e:
-                    logger.warning(f"Error reading {json_file}: {str(e)}")
+                    logger.warning("Error reading %s: %s", json_file, e)
                     summary['files'].append({
                         'filename': json_file.name,
                         'error': str(e)
@@ -181,10 +250,9 @@ class JSONGenerator:
             
             # Save summary report
             summary_path = output_dir / 'processing_summary.json'
-            with open(summary_path, 'w', encoding='utf-8') as f:
-                json.dump(summary, f, indent=2, ensure_ascii=False)
+            _write_json(summary, summary_path)
             
-            logger.info(f"Summary report saved to {summary_path}")
+            logger.info("Summary report saved to %s", summary_path)
             
         except Exception as e:
-            logger.error(f"Error generating summary report: {str(e)}")
+            logger.error("Error generating summary report: %s", e)
@@ -7,10 +7,10 @@ Main entry point for processing PDFs and generating structured JSON outlines.
 import os
 import sys
 import time
-import json
 import logging
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 from pdf_processor import PDFProcessor
 from json_generator import JSONGenerator
@@ -24,16 +24,69 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def _init_file_worker() -> None:
+    """
+    Keep OCR inside a parallel file worker to one core.
+    
+    The file pool already runs one worker per core, so a nested OCR pool or
+    multi-threaded Tesseract in each of them would oversubscribe the CPUs.
+    """
+    Config.OCR_WORKERS = 1
+    os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+
+
+def _process_one(pdf_path: str, output_dir: str) -> Tuple[str, float, bool]:
+    """
+    Process a single PDF in a worker process.
+    
+    Builds its own processor and generator so nothing from the parent
+    needs to be pickled.
+    
+    Returns:
+        Tuple of (file name, processing time in seconds, success flag)
+    """
+    pdf_file = Path(pdf_path)
+    output_file = Path(output_dir) / f"{pdf_file.stem}.json"
+    json_generator = JSONGenerator()
+    start_time = time.time()
+    
+    try:
+        logger.info("Processing: %s", pdf_file.name)
+        pdf_processor = PDFProcessor(Config())
+        
+        # Extract outline
+        result = pdf_processor.extract_outline(pdf_file)
+        
+        # Generate JSON output
+        json_generator.save_outline(result, output_file)
+        
+        return pdf_file.name, time.time() - start_time, True
+        
+    except Exception as e:
+        logger.error("Error processing %s: %s", pdf_file.name, e)
+        # Create error output
+        error_result = {
+            "title": "Error: Could not process document",
+            "outline": [],
+            "error": str(e)
+        }
+        json_generator.save_outline(error_result, output_file)
+        return pdf_file.name, time.time() - start_time, False
+
+
 class OutlineExtractor:
     """Main class for PDF outline extraction system."""
     
     def __init__(self):
         self.config = Config()
-        self.pdf_processor = PDFProcessor(self.config)
-        self.json_generator = JSONGenerator()
         
-    def process_pdfs(self) -> None:
-        """Process all PDFs in the input directory."""
+    def process_pdfs(self, pdf_files: Optional[List[Path]] = None) -> None:
+        """
+        Process PDFs from the input directory.
+        
+        Args:
+            pdf_files: Specific PDFs to process; defaults to every PDF in the input directory
+        """
         input_dir = Path(self.config.INPUT_DIR)
         output_dir = Path(self.config.OUTPUT_DIR)
         
@@ -42,59 +95,61 @@ class OutlineExtractor:
         output_dir.mkdir(parents=True, exist_ok=True)
         
         # Find all PDF files
-        pdf_files = list(input_dir.glob("*.pdf"))
+        if pdf_files is None:
+            with os.scandir(input_dir) as entries:
+                pdf_files = [
+                    Path(entry.path) for entry in entries
+                    if entry.name.endswith('.pdf') and entry.is_file()
+                ]
         
         if not pdf_files:
-            logger.warning(f"No PDF files found in {input_dir}")
+            logger.warning("No PDF files found in %s", input_dir)
             return
         
-        logger.info(f"Found {len(pdf_files)} PDF files to process")
+        logger.info("Found %d PDF files to process", len(pdf_files))
         
-        # Process each PDF
-        for pdf_file in pdf_files:
-            try:
-                start_time = time.time()
-                logger.info(f"Processing: {pdf_file.name}")
-                
-                # Extract outline
-                result = self.pdf_processor.extract_outline(pdf_file)
+        # Process PDFs in parallel; each file is independent
+        max_jobs = self.config.MAX_JOBS or os.cpu_count() or 1
+        max_workers = min(len(pdf_files), max_jobs)
+        max_processing_time = self.config.MAX_PROCESSING_TIME
+        # A single file worker keeps OCR's own page pool and Tesseract threads
+        initializer = _init_file_worker if max_workers > 1 else None
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=initializer) as executor:
+            futures = {
+                executor.submit(_process_one, str(pdf_file), str(output_dir)): pdf_file
+                for pdf_file in pdf_files
+            }
+            for future in as_completed(futures):
+                pdf_file = futures[future]
+                try:
+                    name, processing_time, ok = future.result()
+                except Exception as e:
+                    logger.error("Worker failed for %s: %s", pdf_file.name, e)
+                    continue
                 
-                # Generate JSON output
-                output_file = output_dir / f"{pdf_file.stem}.json"
-                self.json_generator.save_outline(result, output_file)
+                if not ok:
+                    continue
                 
-                processing_time = time.time() - start_time
-                logger.info(f"Completed {pdf_file.name} in {processing_time:.2f} seconds")
+                logger.info("Completed %s in %.2f seconds", name, processing_time)
                 
                 # Check performance constraint
-                if processing_time > self.config.MAX_PROCESSING_TIME:
+                if processing_time > max_processing_time:
                     logger.warning(
-                        f"Processing time ({processing_time:.2f}s) exceeded "
-                        f"limit ({self.config.MAX_PROCESSING_TIME}s)"
+                        "Processing time (%.2fs) exceeded limit (%ss)",
+                        processing_time, max_processing_time
                     )
-                
-            except Exception as e:
-                logger.error(f"Error processing {pdf_file.name}: {str(e)}")
-                # Create error output
-                error_result = {
-                    "title": "Error: Could not process document",
-                    "outline": [],
-                    "error": str(e)
-                }
-                output_file = output_dir / f"{pdf_file.stem}.json"
-                self.json_generator.save_outline(error_result, output_file)
     
-    def run(self) -> None:
-        """Run the outline extraction system."""
+    def run(self, paths: Optional[List[Path]] = None) -> None:
+        """Run the outline extraction system, optionally on a subset of the input PDFs."""
         logger.info("Starting PDF Outline Extraction System")
-        logger.info(f"Input directory: {self.config.INPUT_DIR}")
-        logger.info(f"Output directory: {self.config.OUTPUT_DIR}")
+        logger.info("Input directory: %s", self.config.INPUT_DIR)
+        logger.info("Output directory: %s", self.config.OUTPUT_DIR)
         
         try:
-            self.process_pdfs()
+            self.process_pdfs(paths)
             logger.info("PDF processing completed successfully")
         except Exception as e:
-            logger.error(f"System error: {str(e)}")
+            logger.error("System error: %s", e)
             sys.exit(1)
 
 
@@ -4,24 +4,188 @@ Handles OCR processing for scanned PDFs using Tesseract.
 """
 
 import os
-import tempfile
+import hashlib
+import queue
+import threading
+import multiprocessing
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterator, List, Any, NamedTuple, Optional, Tuple
+from functools import lru_cache
 import logging
 
+import numpy as np
+
 try:
     import pytesseract
-    from PIL import Image
     import fitz  # PyMuPDF for image extraction
     OCR_AVAILABLE = True
 except ImportError as e:
     logging.warning(f"OCR dependencies not available: {e}")
     OCR_AVAILABLE = False
 
+try:
+    import diskcache
+    OCR_CACHE_AVAILABLE = True
+except ImportError:
+    OCR_CACHE_AVAILABLE = False
+
 from config import Config
+from utils import Span, trim_fitz_store
 
 logger = logging.getLogger(__name__)
 
+# Bumped whenever the cached page layout changes so stale entries are ignored
+_CACHE_FORMAT = 4
+
+# Raster zoom the OCR font-size estimate was calibrated at
+_SIZE_REFERENCE_ZOOM = 2.0
+
+
+@lru_cache(maxsize=None)
+def _get_ocr_cache(cache_dir: str) -> Any:
+    """Open the on-disk OCR cache once per process."""
+    return diskcache.Cache(cache_dir)
+
+
+@lru_cache(maxsize=8)
+def _zoom_matrix(zoom: float) -> Any:
+    """Build the rasterization matrix once per zoom level instead of per page."""
+    return fitz.Matrix(zoom, zoom)
+
+
+class _OCRSettings(NamedTuple):
+    """Per-document OCR settings shipped to worker processes."""
+    zooms: Tuple[float, ...]    # First-pass zoom, then escalation zooms
+    grayscale: bool
+    psm: int
+    conf_threshold: int
+    conf_high: int              # Mean confidence that accepts a page without escalation
+    cache_dir: str              # Empty disables the OCR result cache
+    trim_every: int             # Empty PyMuPDF's store every N rendered pages
+
+
+# (width, height, channels, samples) of a rendered page
+Raster = Tuple[int, int, int, bytes]
+
+
+def _render_page(page: Any, zoom: float, grayscale: bool) -> Raster:
+    """Rasterize a fitz page in memory; no PNG encode/decode round trip."""
+    # Grayscale rasters are a third of the bytes and Tesseract binarizes anyway
+    colorspace = fitz.csGRAY if grayscale else fitz.csRGB
+    pix = page.get_pixmap(matrix=_zoom_matrix(zoom), colorspace=colorspace, alpha=False)
+    return pix.width, pix.height, pix.n, pix.samples
+
+
+def _ocr_raster(raster: Raster, page_number: int, zoom: float,
+                settings: _OCRSettings) -> Dict[str, Any]:
+    """OCR a rendered page."""
+    width, height, channels, samples = raster
+    
+    # Wrap the samples as an HxW(xN) array without copying; pytesseract
+    # accepts ndarrays directly
+    image = np.frombuffer(samples, dtype=np.uint8).reshape(height, width, channels)
+    if channels == 1:
+        image = image[:, :, 0]
+    
+    # Coordinates and sizes come back in PDF points whatever the zoom, so
+    # pages OCR'd at different zooms share one scale with native text
+    return OCRHandler._ocr_image(image, page_number, settings.psm, settings.conf_threshold, zoom)
+
+
+def _store_cached(settings: _OCRSettings, key: Optional[str], page_info: Dict[str, Any]) -> None:
+    """Cache a final page result; pages without output are retried next time."""
+    if key is not None and page_info['text_blocks']:
+        _get_ocr_cache(settings.cache_dir)[key] = page_info
+
+
+def _ocr_first_pass(job: Tuple[int, Raster, _OCRSettings]) -> Tuple[Dict[str, Any], bool, Optional[str]]:
+    """
+    OCR a page rendered at the first-pass zoom.
+    
+    Returns:
+        Tuple of (page information, whether it needs a higher zoom, cache key)
+    """
+    page_num, raster, settings = job
+    page_number = page_num + 1
+    
+    # Identical rasters (cover pages, form templates) hit the cache; the
+    # first-pass raster identifies the page for the whole escalation
+    key = None
+    if settings.cache_dir:
+        key = (hashlib.blake2b(raster[3], digest_size=16).hexdigest() +
+               f":{settings.psm}:{settings.conf_threshold}:{settings.conf_high}"
+               f":{settings.zooms}:{_CACHE_FORMAT}")
+        cached = _get_ocr_cache(settings.cache_dir).get(key)
+        if cached is not None:
+            return dict(cached, page_number=page_number), False, key
+    
+    page_info = _ocr_raster(raster, page_number, settings.zooms[0], settings)
+    
+    if len(settings.zooms) > 1 and page_info.get('mean_confidence', 0.0) < settings.conf_high:
+        return page_info, True, key
+    
+    _store_cached(settings, key, page_info)
+    return page_info, False, key
+
+
+def _ocr_escalated(page: Any, page_num: int, settings: _OCRSettings,
+                   key: Optional[str]) -> Dict[str, Any]:
+    """Re-OCR a low-confidence page at the escalation zooms until one is confident enough."""
+    zooms = settings.zooms[1:]
+    for stage, zoom in enumerate(zooms):
+        page_info = _ocr_raster(_render_page(page, zoom, settings.grayscale),
+                                page_num + 1, zoom, settings)
+        
+        mean_confidence = page_info.get('mean_confidence', 0.0)
+        if stage + 1 == len(zooms) or mean_confidence >= settings.conf_high:
+            break
+    
+    _store_cached(settings, key, page_info)
+    return page_info
+
+
+def _ocr_escalated_worker(args: Tuple[str, int, _OCRSettings, Optional[str]]) -> Dict[str, Any]:
+    """Process pool worker: re-open the PDF and re-OCR one page at higher zoom."""
+    pdf_path, page_num, settings, key = args
+    doc = fitz.open(pdf_path)
+    try:
+        return _ocr_escalated(doc[page_num], page_num, settings, key)
+    finally:
+        doc.close()
+
+
+def _render_pages(doc: Any, settings: _OCRSettings, jobs: queue.Queue,
+                  stop: threading.Event, errors: List[BaseException]) -> None:
+    """Renderer thread: rasterize every page at the first-pass zoom into the job queue."""
+    try:
+        for page_num in range(len(doc)):
+            if stop.is_set():
+                break
+            raster = _render_page(doc[page_num], settings.zooms[0], settings.grayscale)
+            jobs.put((page_num, raster, settings))
+            trim_fitz_store(page_num + 1, settings.trim_every)
+    except BaseException as e:
+        errors.append(e)
+    finally:
+        jobs.put(None)
+
+
+def _rendered_jobs(jobs: queue.Queue, stop: threading.Event) -> Iterator[Tuple[int, Raster, _OCRSettings]]:
+    """
+    Yield rendered pages until the renderer's sentinel, or until OCR is stopped.
+    
+    The pool's task handler consumes this in its own thread; polling `stop`
+    lets it finish even when the cleanup drain has already taken the sentinel.
+    """
+    while not stop.is_set():
+        try:
+            job = jobs.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        if job is None:
+            return
+        yield job
+
 
 class OCRHandler:
     """Handles OCR processing for scanned PDFs."""
@@ -35,6 +199,12 @@ class OCRHandler:
             tesseract_cmd = os.getenv('TESSERACT_CMD', 'tesseract')
             if tesseract_cmd != 'tesseract':
                 pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+        
+        # Content-addressed OCR result cache (disabled when no directory is set)
+        self.cache_dir = self.config.OCR_CACHE_DIR
+        if self.cache_dir and not OCR_CACHE_AVAILABLE:
+            logger.warning("OCR_CACHE_DIR is set but diskcache is not installed; OCR caching disabled")
+            self.cache_dir = ''
     
     def extract_text(self, pdf_path: Path) -> Optional[Dict[str, Any]]:
         """
@@ -52,54 +222,126 @@ class OCRHandler:
         
         try:
             doc = fitz.open(str(pdf_path))
+            page_count = len(doc)
             doc_info = {
                 'pages': [],
-                'total_pages': len(doc)
+                'total_pages': page_count
             }
             
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                
-                # Convert page to image
-                mat = fitz.Matrix(2.0, 2.0)  # 2x zoom for better OCR
-                pix = page.get_pixmap(matrix=mat)
-                
-                # Save to temporary image file
-                with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as temp_file:
-                    pix.save(temp_file.name)
-                    temp_image_path = temp_file.name
-                
-                try:
-                    # Perform OCR
-                    page_info = self._ocr_image(temp_image_path, page_num + 1)
-                    doc_info['pages'].append(page_info)
-                    
-                finally:
-                    # Clean up temporary file
-                    os.unlink(temp_image_path)
-            
-            doc.close()
+            if self.config.OCR_HIGH_QUALITY:
+                # Escape hatch for low-accuracy documents: 2x zoom, full color
+                zooms, grayscale = (2.0,), False
+            else:
+                # Try a cheap low-zoom pass first and only re-rasterize pages
+                # whose confidence falls short
+                zoom = self.config.OCR_DPI_ZOOM
+                fast_zoom = self.config.OCR_FAST_ZOOM
+                zooms = (fast_zoom, zoom) if 0 < fast_zoom < zoom else (zoom,)
+                grayscale = self.config.OCR_COLORSPACE != 'rgb'
+            settings = _OCRSettings(
+                zooms=zooms,
+                grayscale=grayscale,
+                psm=6,  # Uniform block of text
+                conf_threshold=self.config.OCR_CONFIDENCE_THRESHOLD,
+                conf_high=self.config.OCR_CONFIDENCE_HIGH,
+                cache_dir=self.cache_dir,
+                trim_every=self.config.FITZ_STORE_TRIM_PAGES
+            )
+            
+            # Tesseract already uses ~4 threads per invocation
+            workers = min(page_count, self.config.OCR_WORKERS or max(1, (os.cpu_count() or 1) // 4))
+            
+            # Single page or too few cores: not worth a process pool. The pool
+            # forks before the renderer starts, so no worker inherits MuPDF
+            # state from a thread that is mid-render
+            pool = multiprocessing.Pool(workers) if workers > 1 else None
+            
+            # Pipeline: a renderer thread rasterizes pages ahead of OCR and is
+            # the only thread touching the document until it finishes. PyMuPDF
+            # holds the GIL while rendering; the overlap comes from OCR running
+            # outside this interpreter, in pool workers or the tesseract binary
+            jobs = queue.Queue(maxsize=2 * workers)
+            stop = threading.Event()
+            errors = []
+            renderer = threading.Thread(
+                target=_render_pages, args=(doc, settings, jobs, stop, errors), daemon=True
+            )
+            renderer.start()
+            
+            try:
+                if pool is None:
+                    results = [_ocr_first_pass(job) for job in _rendered_jobs(jobs, stop)]
+                    renderer.join()
+                    pages = [
+                        _ocr_escalated(doc[page_num], page_num, settings, key) if escalate else page_info
+                        for page_num, (page_info, escalate, key) in enumerate(results)
+                    ]
+                else:
+                    # Workers receive rendered pages, so only escalated pages
+                    # make a worker re-open the PDF
+                    results = list(pool.imap(_ocr_first_pass, _rendered_jobs(jobs, stop)))
+                    renderer.join()
+                    escalated = [
+                        (str(pdf_path), page_num, settings, key)
+                        for page_num, (_, escalate, key) in enumerate(results) if escalate
+                    ]
+                    rerun = iter(pool.map(_ocr_escalated_worker, escalated, chunksize=1))
+                    pages = [
+                        next(rerun) if escalate else page_info
+                        for page_info, escalate, _ in results
+                    ]
+            finally:
+                # If OCR stopped early, unblock the renderer before closing the document
+                stop.set()
+                while renderer.is_alive():
+                    try:
+                        jobs.get(timeout=0.1)
+                    except queue.Empty:
+                        pass
+                if pool is not None:
+                    pool.terminate()
+                doc.close()
+            
+            if errors:
+                raise errors[0]
+            
+            doc_info['pages'] = pages
+            
+            if len(zooms) > 1:
+                escalated_count = sum(1 for _, escalate, _ in results if escalate)
+                logger.debug("Re-ran OCR at higher zoom for %d of %d pages",
+                             escalated_count, page_count)
+            
             return doc_info
             
         except Exception as e:
             logger.error(f"OCR extraction failed: {str(e)}")
             return None
     
-    def _ocr_image(self, image_path: str, page_number: int) -> Dict[str, Any]:
-        """Perform OCR on a single image and structure the results."""
+    @staticmethod
+    def _ocr_image(image: Any, page_number: int, psm: int,
+                   conf_threshold: int, zoom: float = 1.0) -> Dict[str, Any]:
+        """
+        Perform OCR on a single page image (PIL image or ndarray) and structure the results.
+        
+        `zoom` is the scale the page was rasterized at; bounding boxes are
+        divided by it to give PDF points, and estimated font sizes keep the
+        scale of 2x-zoom pixel heights whatever the zoom.
+        """
         try:
-            # Open image
-            image = Image.open(image_path)
-            
             # Get detailed OCR data with bounding boxes
             ocr_data = pytesseract.image_to_data(
                 image, 
                 output_type=pytesseract.Output.DICT,
-                config='--psm 6'  # Uniform block of text
+                config=f'--psm {psm}'
             )
             
-            # Extract plain text as fallback
-            raw_text = pytesseract.image_to_string(image)
+            # Rebuild plain text from the recognized words instead of a
+            # second Tesseract run via image_to_string
+            raw_text = ' '.join(
+                text for text, conf in zip(ocr_data['text'], ocr_data['conf'])
+                if text.strip() and int(conf) >= 0
+            )
             
             page_info = {
                 'page_number': page_number,
@@ -107,40 +349,46 @@ class OCRHandler:
                 'raw_text': raw_text
             }
             
-            # Process OCR data to create text blocks
-            current_block = None
-            
-            for i in range(len(ocr_data['text'])):
-                text = ocr_data['text'][i].strip()
-                conf = int(ocr_data['conf'][i])
-                
-                # Skip low confidence text
-                if conf < self.config.OCR_CONFIDENCE_THRESHOLD or not text:
-                    continue
-                
-                # Create text block
-                left = ocr_data['left'][i]
-                top = ocr_data['top'][i]
-                width = ocr_data['width'][i]
-                height = ocr_data['height'][i]
-                
-                # Estimate font size based on height
-                estimated_font_size = max(height * 0.7, 8)
-                
-                text_block = {
-                    'text': text,
-                    'font': 'ocr-detected',
-                    'size': estimated_font_size,
-                    'flags': 0,  # Can't detect bold/italic from OCR easily
-                    'bbox': [left, top, left + width, top + height],
-                    'color': 0,
-                    'confidence': conf
-                }
-                
-                page_info['text_blocks'].append(text_block)
-            
-            # Post-process to merge nearby text blocks
-            page_info['text_blocks'] = self._merge_nearby_blocks(page_info['text_blocks'])
+            # Process OCR data to create text blocks; numeric columns are
+            # filtered and transformed as arrays, dicts built only for kept words
+            texts = [text.strip() for text in ocr_data['text']]
+            conf = np.asarray(ocr_data['conf'], dtype=np.float64).astype(np.int64)
+            has_text = np.fromiter((bool(text) for text in texts), dtype=bool, count=len(texts))
+            
+            # Mean confidence of recognized words drives zoom escalation
+            positive = conf[conf > 0]
+            page_info['mean_confidence'] = float(positive.mean()) if positive.size else 0.0
+            
+            # Skip low confidence text
+            keep = np.flatnonzero((conf >= conf_threshold) & has_text)
+            
+            left = np.asarray(ocr_data['left'], dtype=np.int64)[keep]
+            top = np.asarray(ocr_data['top'], dtype=np.int64)[keep]
+            right = left + np.asarray(ocr_data['width'], dtype=np.int64)[keep]
+            height = np.asarray(ocr_data['height'], dtype=np.int64)[keep]
+            bottom = top + height
+            
+            # Estimate font size based on height; the 0.7 factor and the 8
+            # floor were tuned on 2x-zoom pixel heights, so heights are
+            # brought to that scale first
+            estimated_font_sizes = np.maximum(height * (0.7 * _SIZE_REFERENCE_ZOOM / zoom), 8)
+            
+            # Flags stay 0: can't detect bold/italic from OCR easily
+            page_info['text_blocks'] = [
+                Span(texts[i], 'ocr-detected', size, 0, [l, t, r, b], 0, c)
+                for i, size, l, t, r, b, c in zip(
+                    keep.tolist(), estimated_font_sizes.tolist(), left.tolist(),
+                    top.tolist(), right.tolist(), bottom.tolist(), conf[keep].tolist()
+                )
+            ]
+            
+            # Post-process to merge nearby text blocks; the merge thresholds
+            # are in image pixels, so boxes are scaled to points afterwards
+            text_blocks = OCRHandler._merge_nearby_blocks(page_info['text_blocks'])
+            if zoom != 1.0:
+                for block in text_blocks:
+                    block.bbox = [coord / zoom for coord in block.bbox]
+            page_info['text_blocks'] = text_blocks
             
             return page_info
             
@@ -152,70 +400,63 @@ class OCRHandler:
                 'raw_text': ""
             }
     
-    def _merge_nearby_blocks(self, text_blocks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    @staticmethod
+    def _merge_nearby_blocks(text_blocks: List[Span]) -> List[Span]:
         """Merge nearby text blocks that likely belong together."""
         if not text_blocks:
             return text_blocks
         
-        merged = []
-        sorted_blocks = sorted(text_blocks, key=lambda x: (x['bbox'][1], x['bbox'][0]))
-        
-        current_line = []
-        current_y = None
-        
-        for block in sorted_blocks:
-            bbox = block['bbox']
-            block_y = bbox[1]
-            
-            # If this block is on the same line (similar Y coordinate)
-            if current_y is None or abs(block_y - current_y) < 10:
-                current_line.append(block)
-                current_y = block_y if current_y is None else current_y
-            else:
-                # Process current line
-                if current_line:
-                    merged.extend(self._merge_line_blocks(current_line))
-                
-                # Start new line
-                current_line = [block]
-                current_y = block_y
+        count = len(text_blocks)
+        lefts = np.fromiter((block.bbox[0] for block in text_blocks), dtype=np.float64, count=count)
+        tops = np.fromiter((block.bbox[1] for block in text_blocks), dtype=np.float64, count=count)
         
-        # Process final line
-        if current_line:
-            merged.extend(self._merge_line_blocks(current_line))
+        # Group into lines: a block joins the current line while its Y is
+        # within 10px of the line's first block
+        order = np.lexsort((lefts, tops))
+        line_ids = np.empty(count, dtype=np.int64)
+        line_id = 0
+        line_y = tops[order[0]]
+        for index in order.tolist():
+            if abs(tops[index] - line_y) >= 10:
+                line_id += 1
+                line_y = tops[index]
+            line_ids[index] = line_id
         
-        return merged
-    
-    def _merge_line_blocks(self, line_blocks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Merge blocks on the same line that are close together."""
-        if len(line_blocks) <= 1:
-            return line_blocks
-        
-        # Sort by X coordinate
-        line_blocks.sort(key=lambda x: x['bbox'][0])
+        # Within each line, order blocks by X coordinate
+        order = np.lexsort((tops, lefts, line_ids)).tolist()
+        line_ids = line_ids.tolist()
         
         merged = []
-        current_block = line_blocks[0].copy()
-        
-        for i in range(1, len(line_blocks)):
-            next_block = line_blocks[i]
-            
-            # Check if blocks are close enough to merge
-            current_right = current_block['bbox'][2]
-            next_left = next_block['bbox'][0]
+        current = None
+        for index in order:
+            block = text_blocks[index]
+            bbox = block.bbox
             
             # Merge if gap is small (less than average character width)
-            avg_char_width = (current_block['bbox'][2] - current_block['bbox'][0]) / max(len(current_block['text']), 1)
+            if (current is not None and line_ids[index] == current_line and
+                    bbox[0] - right < (right - left) / max(text_len, 1) * 2):
+                texts.append(block.text)
+                text_len += 1 + len(block.text)
+                right = bbox[2]  # Extend right boundary
+                size = max(size, block.size)
+                continue
             
-            if next_left - current_right < avg_char_width * 2:
-                # Merge blocks
-                current_block['text'] += ' ' + next_block['text']
-                current_block['bbox'][2] = next_block['bbox'][2]  # Extend right boundary
-                current_block['size'] = max(current_block['size'], next_block['size'])
-            else:
-                # Blocks are too far apart, finalize current and start new
-                merged.append(current_block)
-                current_block = next_block.copy()
+            if current is not None:
+                merged.append(OCRHandler._merged_span(current, texts, size, left, right))
+            
+            current = block
+            current_line = line_ids[index]
+            texts = [block.text]
+            text_len = len(block.text)
+            left, right = bbox[0], bbox[2]
+            size = block.size
         
-        merged.append(current_block)
+        merged.append(OCRHandler._merged_span(current, texts, size, left, right))
         return merged
+    
+    @staticmethod
+    def _merged_span(first: Span, texts: List[str], size: float,
+                     left: float, right: float) -> Span:
+        """Build the span for a run of merged blocks, styled like its first block."""
+        return Span(' '.join(texts), first.font, size, first.flags,
+                    [left, first.bbox[1], right, first.bbox[3]], first.color, first.confidence)
@@ -13,9 +13,14 @@ from title_extractor import TitleExtractor
 from heading_detector import HeadingDetector
 from ocr_handler import OCRHandler
 from config import Config
+from utils import Span, trim_fitz_store
 
 logger = logging.getLogger(__name__)
 
+# Text extraction flags for native pages: the plain-text defaults (ligatures,
+# whitespace, mediabox clipping), without the image extraction "dict" adds
+_TEXTPAGE_FLAGS = fitz.TEXTFLAGS_TEXT
+
 
 class PDFProcessor:
     """Main PDF processing class that orchestrates text extraction and analysis."""
@@ -64,101 +69,135 @@ class PDFProcessor:
     
     def _extract_native_pdf(self, pdf_path: Path) -> Dict[str, Any]:
         """Extract text and layout information from native PDF."""
+        # Use PyMuPDF for primary extraction
+        doc_info = None
+        try:
+            doc_info = self._extract_with_fitz(pdf_path)
+        except Exception as e:
+            logger.warning(f"PyMuPDF extraction failed: {str(e)}")
+        
+        # Fallback to pdfplumber only when PyMuPDF produced nothing; it is
+        # far slower and would redo pages PyMuPDF already extracted
+        if doc_info is None or not doc_info['pages']:
+            try:
+                doc_info = self._extract_with_pdfplumber(pdf_path)
+            except Exception as e:
+                logger.error(f"pdfplumber extraction failed: {str(e)}")
+                raise
+        
+        return doc_info
+    
+    def _extract_with_fitz(self, pdf_path: Path) -> Dict[str, Any]:
+        """Extract pages with PyMuPDF, keeping those read before any mid-document failure."""
         doc_info = {
             'pages': [],
-            'total_pages': 0
+            'total_pages': 0,
+            'total_text_len': 0
         }
         
-        # Use PyMuPDF for primary extraction
+        doc = fitz.open(str(pdf_path))
         try:
-            doc = fitz.open(str(pdf_path))
             doc_info['total_pages'] = len(doc)
             
+            # Pages are extracted serially: PyMuPDF is not thread-safe and
+            # holds the GIL, so a thread pool would not run them in parallel
+            trim_every = self.config.FITZ_STORE_TRIM_PAGES
             for page_num in range(len(doc)):
-                page = doc[page_num]
-                
-                # Extract text blocks with detailed formatting
-                blocks = page.get_text("dict")
-                
+                try:
+                    page_info, text_len = self._extract_native_page(doc[page_num], page_num)
+                except Exception as e:
+                    logger.warning(f"PyMuPDF extraction stopped at page {page_num + 1}: {str(e)}")
+                    break
+                doc_info['pages'].append(page_info)
+                doc_info['total_text_len'] += text_len
+                trim_fitz_store(page_num + 1, trim_every)
+        finally:
+            doc.close()
+        
+        return doc_info
+    
+    def _extract_with_pdfplumber(self, pdf_path: Path) -> Dict[str, Any]:
+        """Extract pages with pdfplumber, grouping characters into text blocks."""
+        doc_info = {
+            'pages': [],
+            'total_pages': 0
+        }
+        
+        with pdfplumber.open(str(pdf_path)) as pdf:
+            doc_info['total_pages'] = len(pdf.pages)
+            
+            for page_num, page in enumerate(pdf.pages):
                 page_info = {
                     'page_number': page_num + 1,
                     'text_blocks': [],
-                    'raw_text': page.get_text()
+                    'raw_text': page.extract_text() or ""
                 }
                 
-                # Process text blocks
-                for block in blocks.get('blocks', []):
-                    if 'lines' in block:
-                        for line in block['lines']:
-                            for span in line['spans']:
-                                text_block = {
-                                    'text': span['text'].strip(),
-                                    'font': span['font'],
-                                    'size': span['size'],
-                                    'flags': span['flags'],  # Bold, italic flags
-                                    'bbox': span['bbox'],    # Bounding box
-                                    'color': span.get('color', 0)
-                                }
-                                
-                                if text_block['text']:
-                                    page_info['text_blocks'].append(text_block)
-                
-                doc_info['pages'].append(page_info)
-            
-            doc.close()
-            return doc_info
-            
-        except Exception as e:
-            logger.warning(f"PyMuPDF extraction failed: {str(e)}")
-            
-        # Fallback to pdfplumber
-        try:
-            with pdfplumber.open(str(pdf_path)) as pdf:
-                doc_info['total_pages'] = len(pdf.pages)
+                # Columns of the non-blank characters, read once
+                chars = [char for char in page.chars if char['text'].strip()]
+                sizes = [char['size'] for char in chars]
+                tops = [char['top'] for char in chars]
                 
-                for page_num, page in enumerate(pdf.pages):
-                    chars = page.chars
-                    
-                    page_info = {
-                        'page_number': page_num + 1,
-                        'text_blocks': [],
-                        'raw_text': page.extract_text() or ""
-                    }
-                    
-                    # Group characters into text blocks
-                    current_block = None
-                    for char in chars:
-                        if char['text'].strip():
-                            if (current_block is None or 
-                                abs(char['size'] - current_block['size']) > 0.1 or
-                                abs(char['top'] - current_block['bbox'][1]) > 2):
-                                
-                                if current_block:
-                                    page_info['text_blocks'].append(current_block)
-                                
-                                current_block = {
-                                    'text': char['text'],
-                                    'font': char.get('fontname', 'unknown'),
-                                    'size': char['size'],
-                                    'flags': 0,  # pdfplumber doesn't provide flags directly
-                                    'bbox': [char['x0'], char['top'], char['x1'], char['bottom']],
-                                    'color': 0
-                                }
-                            else:
-                                current_block['text'] += char['text']
-                                # Extend bounding box
-                                current_block['bbox'][2] = char['x1']
-                    
-                    if current_block:
-                        page_info['text_blocks'].append(current_block)
-                    
-                    doc_info['pages'].append(page_info)
+                # A block starts whenever size or baseline moves away from
+                # the block's first character
+                starts = []
+                block_size = block_top = None
+                for i, (size, top) in enumerate(zip(sizes, tops)):
+                    if (block_size is None or abs(size - block_size) > 0.1 or
+                            abs(top - block_top) > 2):
+                        starts.append(i)
+                        block_size, block_top = size, top
                 
-                return doc_info
+                # Materialize one dict per block from the character slices
+                for start, end in zip(starts, starts[1:] + [len(chars)]):
+                    first = chars[start]
+                    page_info['text_blocks'].append(Span(
+                        ''.join(char['text'] for char in chars[start:end]),
+                        first.get('fontname', 'unknown'),
+                        first['size'],
+                        0,  # pdfplumber doesn't provide flags directly
+                        [first['x0'], first['top'], chars[end - 1]['x1'], first['bottom']],
+                        0,
+                        None
+                    ))
                 
-        except Exception as e:
-            logger.error(f"pdfplumber extraction failed: {str(e)}")
-            raise
+                doc_info['pages'].append(page_info)
+        
+        return doc_info
+    
+    def _extract_native_page(self, page: Any, page_num: int) -> Tuple[Dict[str, Any], int]:
+        """
+        Extract text blocks with detailed formatting from a single PyMuPDF page.
+        
+        Returns:
+            Page information and the total length of its span text
+        """
+        # One text page serves both the span dict and the raw text. Image
+        # blocks are not extracted: they carry no text and were skipped anyway
+        textpage = page.get_textpage(flags=_TEXTPAGE_FLAGS)
+        blocks = textpage.extractDICT()
+        
+        page_info = {
+            'page_number': page_num + 1,
+            'text_blocks': [],
+            'raw_text': textpage.extractText()
+        }
+        text_blocks = page_info['text_blocks']
+        text_len = 0
+        
+        # Process text blocks
+        for block in blocks.get('blocks', ()):
+            for line in block.get('lines', ()):
+                for span in line['spans']:
+                    text = span['text'].strip()
+                    if text:
+                        text_blocks.append(Span(
+                            text, span['font'], span['size'], span['flags'],
+                            span['bbox'], span.get('color', 0), None
+                        ))
+                        text_len += len(text)
+        
+        return page_info, text_len
     
     def _extract_with_ocr(self, pdf_path: Path) -> Optional[Dict[str, Any]]:
         """Extract text using OCR for scanned PDFs."""
@@ -173,15 +212,19 @@ class PDFProcessor:
         if not doc_info or not doc_info.get('pages'):
             return True
         
-        # Check if we have sufficient text content
-        total_text = sum(
-            len(page.get('raw_text', '').strip()) 
-            for page in doc_info['pages']
-        )
-        
-        # If very little text was extracted, likely a scanned PDF
-        if total_text < self.config.MIN_TEXT_LENGTH:
-            return True
+        # Check if we have sufficient text content. Span text tracked during
+        # native extraction never exceeds the page text, so it settles the
+        # common case without re-scanning raw_text
+        min_text_length = self.config.MIN_TEXT_LENGTH
+        if doc_info.get('total_text_len', 0) < min_text_length:
+            total_text = 0
+            for page in doc_info['pages']:
+                total_text += len(page.get('raw_text', '').strip())
+                if total_text >= min_text_length:
+                    break
+            else:
+                # If very little text was extracted, likely a scanned PDF
+                return True
         
         # Check for low-quality text blocks
         total_blocks = sum(
@@ -9,6 +9,7 @@ import sys
 import argparse
 import logging
 from pathlib import Path
+from typing import List
 
 # Add current directory to Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -33,6 +34,40 @@ def setup_logging(level: str = 'INFO'):
     )
 
 
+# Error payloads have an empty outline, so their "error" key sits within the
+# first few hundred bytes; an unescaped '"error":' only occurs as a JSON key
+_ERROR_KEY = b'"error":'
+_ERROR_SCAN_BYTES = 4096
+
+
+def _is_failed_output(output_file: Path) -> bool:
+    """Check whether an output JSON records a failed run (or is unreadable)."""
+    try:
+        with open(output_file, 'rb') as f:
+            head = f.read(_ERROR_SCAN_BYTES)
+    except OSError:
+        return True
+    return _ERROR_KEY in head
+
+
+def find_outdated_pdfs(input_dir: Path, output_dir: Path) -> List[Path]:
+    """Find PDFs whose JSON output is missing, older than the PDF, or an error payload."""
+    outdated = []
+    with os.scandir(input_dir) as entries:
+        for entry in entries:
+            if not entry.name.endswith('.pdf') or not entry.is_file():
+                continue
+            output_file = output_dir / f"{Path(entry.name).stem}.json"
+            try:
+                output_mtime = os.stat(output_file).st_mtime
+            except OSError:
+                output_mtime = None
+            if (output_mtime is None or output_mtime < entry.stat().st_mtime or
+                    _is_failed_output(output_file)):
+                outdated.append(Path(entry.path))
+    return outdated
+
+
 def main():
     """Main entry point for the run script."""
     parser = argparse.ArgumentParser(
@@ -43,6 +78,8 @@ Examples:
   python run.py                          # Run with default settings
   python run.py --input ./pdfs --output ./results
   python run.py --verbose               # Enable verbose logging
+  python run.py --jobs 4               # Process up to 4 PDFs in parallel
+  python run.py --force                # Reprocess PDFs with up-to-date output
   python run.py --config               # Show current configuration
   python run.py --summary              # Generate summary report only
         """
@@ -60,6 +97,18 @@ Examples:
         help='Output directory for JSON files (default: /app/output)'
     )
     
+    parser.add_argument(
+        '--jobs', '-j',
+        type=int,
+        help='Number of PDFs to process in parallel (default: one per CPU)'
+    )
+    
+    parser.add_argument(
+        '--force', '-f',
+        action='store_true',
+        help='Reprocess all PDFs, even those whose JSON output is up to date'
+    )
+    
     parser.add_argument(
         '--verbose', '-v',
         action='store_true',
@@ -98,6 +147,10 @@ Examples:
         Config.INPUT_DIR = args.input
     if args.output:
         Config.OUTPUT_DIR = args.output
+    if args.jobs is not None:
+        if args.jobs < 1:
+            parser.error('--jobs must be at least 1')
+        Config.MAX_JOBS = args.jobs
     
     # Setup logging
     if args.verbose:
@@ -135,7 +188,16 @@ Examples:
     try:
         logger.info("Starting PDF Outline Extraction System")
         extractor = OutlineExtractor()
-        extractor.run()
+        
+        # Skip PDFs whose output is newer than the PDF unless forced
+        pdf_paths = None
+        if not args.force:
+            pdf_paths = find_outdated_pdfs(Path(Config.INPUT_DIR), Path(Config.OUTPUT_DIR))
+        
+        if pdf_paths == []:
+            logger.info("All outputs are up to date; use --force to reprocess")
+        else:
+            extractor.run(paths=pdf_paths)
         
         # Generate summary report after processing
         try:
@@ -0,0 +1,82 @@
+"""
+Tests for the OCR page pipeline in ocr_handler.
+Run from the round1a directory with: python -m unittest discover tests
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ocr_handler
+from config import Config
+from ocr_handler import OCRHandler
+
+
+def _failing_first_pass(job):
+    """Stand-in for _ocr_first_pass that fails on every page."""
+    raise RuntimeError("first pass failed")
+
+
+_original_render_page = ocr_handler._render_page
+
+
+def _slow_render_page(page, zoom, grayscale):
+    """Render slowly so OCR fails while the renderer still has pages to go."""
+    time.sleep(0.05)
+    return _original_render_page(page, zoom, grayscale)
+
+
+@unittest.skipUnless(ocr_handler.OCR_AVAILABLE, "OCR dependencies not available")
+class TestOCRPipelineFailure(unittest.TestCase):
+    """A failing first pass must end extract_text, not hang it."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        cls.pdf_path = Path(cls.tmp_dir.name) / "blank.pdf"
+        doc = ocr_handler.fitz.open()
+        for _ in range(20):
+            doc.new_page(width=200, height=200)
+        doc.save(str(cls.pdf_path))
+        doc.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp_dir.cleanup()
+
+    def _extract_with_failing_first_pass(self, ocr_workers: int):
+        config = Config()
+        config.OCR_WORKERS = ocr_workers
+        config.OCR_CACHE_DIR = ''
+        handler = OCRHandler(config)
+
+        result = {}
+
+        def target():
+            result['value'] = handler.extract_text(self.pdf_path)
+
+        with mock.patch.object(ocr_handler, '_ocr_first_pass', _failing_first_pass), \
+                mock.patch.object(ocr_handler, '_render_page', _slow_render_page):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            thread.join(timeout=30)
+
+        self.assertFalse(thread.is_alive(), "extract_text hung after a first-pass failure")
+        self.assertIsNone(result['value'])
+
+    def test_serial_first_pass_failure_returns_none(self):
+        self._extract_with_failing_first_pass(ocr_workers=1)
+
+    def test_pool_first_pass_failure_returns_none(self):
+        self._extract_with_failing_first_pass(ocr_workers=2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,13 +4,66 @@ Implements heuristics for detecting document titles from the first page.
 """
 
 import re
+from functools import lru_cache
 from typing import Dict, List, Any, Optional
 import logging
 
+import numpy as np
+
 from config import Config
 
 logger = logging.getLogger(__name__)
 
+# Title-like text patterns, compiled once
+_TITLE_PATTERNS = tuple(re.compile(pattern) for pattern in (
+    r'^[A-Z][a-z\s]+$',  # Starts with capital, contains words
+    r'^[A-Z\s]+$',       # All caps with spaces
+    r'^\w+(\s+\w+)*$'    # Multiple words
+))
+
+# Common non-title patterns in one alternation: just numbers, page numbers,
+# chapter numbers only, URLs, email addresses
+_AVOID_PATTERN = re.compile(r'^\d+$|^page\s+\d+|^chapter\s+\d+|^www\.|@')
+
+# Candidate score contributed by each extraction strategy, in the order
+# extract_title applies them
+_STRATEGY_WEIGHTS = {'font_size': 3, 'position': 2, 'style': 2, 'top': 1}
+
+
+def _looks_like_title(text: str) -> bool:
+    """Check if text looks like a title based on patterns."""
+    text = text.strip()
+    
+    # Check for title patterns
+    for pattern in _TITLE_PATTERNS:
+        if pattern.match(text):
+            return True
+    
+    # Avoid common non-title patterns
+    if _AVOID_PATTERN.search(text.lower()):
+        return False
+    
+    return True
+
+
+@lru_cache(maxsize=64)
+def _text_score(text: str) -> int:
+    """Score a title candidate on its text alone."""
+    score = 0
+    
+    # Penalize very short or very long text
+    text_length = len(text.strip())
+    if 5 <= text_length <= 100:
+        score += 1
+    elif text_length > 200:
+        score -= 2
+    
+    # Bonus for title-like patterns
+    if _looks_like_title(text):
+        score += 2
+    
+    return score
+
 
 class TitleExtractor:
     """Extracts document titles using font size and positioning heuristics."""
@@ -33,221 +86,99 @@ class TitleExtractor:
         if not text_blocks:
             return "Untitled Document"
         
-        # Apply multiple extraction strategies
-        candidates = []
-        
-        # Strategy 1: Largest font size
-        largest_font_candidate = self._find_by_font_size(text_blocks)
-        if largest_font_candidate:
-            candidates.append(('font_size', largest_font_candidate))
-        
-        # Strategy 2: Central positioning
-        centered_candidate = self._find_by_position(text_blocks)
-        if centered_candidate:
-            candidates.append(('position', centered_candidate))
-        
-        # Strategy 3: Bold text
-        bold_candidate = self._find_by_style(text_blocks)
-        if bold_candidate:
-            candidates.append(('style', bold_candidate))
-        
-        # Strategy 4: Top positioning
-        top_candidate = self._find_by_top_position(text_blocks)
-        if top_candidate:
-            candidates.append(('top', top_candidate))
+        # Read every block once into column arrays shared by all strategies
+        count = len(text_blocks)
+        sizes = np.fromiter((block.size for block in text_blocks), dtype=np.float64, count=count)
+        bboxes = np.array([block.bbox for block in text_blocks], dtype=np.float64).reshape(count, 4)
+        lefts, tops, rights = bboxes[:, 0], bboxes[:, 1], bboxes[:, 2]
+        flags = np.fromiter((block.flags for block in text_blocks), dtype=np.int64, count=count)
+        fonts = [block.font.lower() for block in text_blocks]
+        
+        # Apply multiple extraction strategies; each picks one block index
+        picks = (
+            self._find_by_font_size(sizes, tops),          # Strategy 1: Largest font size
+            self._find_by_position(lefts, tops, rights),   # Strategy 2: Central positioning
+            self._find_by_style(flags, fonts, tops),       # Strategy 3: Bold text
+            self._find_by_top_position(sizes, tops),       # Strategy 4: Top positioning
+        )
+        
+        # Score the picks in the same pass: strategy weight plus text bonuses,
+        # pooled when several strategies agree on the same text
+        scores: Dict[str, int] = {}
+        for weight, index in zip(_STRATEGY_WEIGHTS.values(), picks):
+            if index is None:
+                continue
+            text = text_blocks[index].text
+            if not text:
+                continue
+            if text not in scores:
+                scores[text] = _text_score(text)
+            scores[text] += weight
         
-        # Score and select best candidate
-        best_title = self._select_best_candidate(candidates, text_blocks)
+        # Highest scoring candidate; ties go to the earlier strategy
+        best_title = max(scores, key=scores.get) if scores else None
         
         return self._clean_title(best_title) if best_title else "Untitled Document"
     
-    def _find_by_font_size(self, text_blocks: List[Dict[str, Any]]) -> Optional[str]:
-        """Find title by largest font size."""
-        if not text_blocks:
+    @staticmethod
+    def _topmost(mask: np.ndarray, tops: np.ndarray) -> Optional[int]:
+        """Index of the highest block on the page among those selected by mask."""
+        indices = np.flatnonzero(mask)
+        if not indices.size:
             return None
-        
+        # argmin keeps the first of equal tops, like a stable sort would
+        return int(indices[np.argmin(tops[indices])])
+    
+    def _find_by_font_size(self, sizes: np.ndarray, tops: np.ndarray) -> Optional[int]:
+        """Find title by largest font size."""
         # Get font sizes and find the largest
-        font_sizes = [block['size'] for block in text_blocks if block.get('size', 0) > 0]
-        if not font_sizes:
+        positive = sizes[sizes > 0]
+        if not positive.size:
             return None
         
-        max_font_size = max(font_sizes)
+        max_font_size = positive.max()
         
-        # Find blocks with the largest font size
-        largest_blocks = [
-            block for block in text_blocks 
-            if abs(block.get('size', 0) - max_font_size) < 0.1
-        ]
-        
-        # Prefer blocks in the upper portion of the page
-        largest_blocks.sort(key=lambda x: x.get('bbox', [0, 0, 0, 0])[1])
-        
-        if largest_blocks:
-            return largest_blocks[0]['text']
-        
-        return None
+        # Prefer the largest-font block in the upper portion of the page
+        return self._topmost(np.abs(sizes - max_font_size) < 0.1, tops)
     
-    def _find_by_position(self, text_blocks: List[Dict[str, Any]]) -> Optional[str]:
+    def _find_by_position(self, lefts: np.ndarray, tops: np.ndarray,
+                          rights: np.ndarray) -> Optional[int]:
         """Find title by central horizontal positioning."""
-        if not text_blocks:
-            return None
-        
         # Calculate page width (approximate)
-        if text_blocks:
-            page_width = max(
-                block.get('bbox', [0, 0, 0, 0])[2] 
-                for block in text_blocks
-            )
-        else:
-            return None
+        page_width = rights.max()
         
-        centered_blocks = []
+        center_x = lefts + (rights - lefts) / 2
+        page_center = page_width / 2
         
-        for block in text_blocks:
-            bbox = block.get('bbox', [0, 0, 0, 0])
-            text_width = bbox[2] - bbox[0]
-            center_x = bbox[0] + text_width / 2
-            page_center = page_width / 2
-            
-            # Check if text is reasonably centered
-            center_tolerance = page_width * 0.2  # 20% tolerance
-            if abs(center_x - page_center) < center_tolerance:
-                # Prefer blocks in upper portion
-                if bbox[1] < page_width * 0.3:  # Upper 30% of page
-                    centered_blocks.append((bbox[1], block))
-        
-        if centered_blocks:
-            # Sort by vertical position (top first)
-            centered_blocks.sort(key=lambda x: x[0])
-            return centered_blocks[0][1]['text']
+        # Check if text is reasonably centered (20% tolerance)
+        # and prefer blocks in upper portion (upper 30% of page)
+        center_tolerance = page_width * 0.2
+        mask = (np.abs(center_x - page_center) < center_tolerance) & (tops < page_width * 0.3)
         
-        return None
+        return self._topmost(mask, tops)
     
-    def _find_by_style(self, text_blocks: List[Dict[str, Any]]) -> Optional[str]:
+    def _find_by_style(self, flags: np.ndarray, fonts: List[str], tops: np.ndarray) -> Optional[int]:
         """Find title by bold or special styling."""
-        # Look for bold text (flag bit 4 in PyMuPDF)
-        bold_blocks = []
-        
-        for block in text_blocks:
-            flags = block.get('flags', 0)
-            
-            # Check for bold flag (16 in PyMuPDF flags)
-            is_bold = (flags & 16) != 0
-            
-            # Also check font name for bold indicators
-            font_name = block.get('font', '').lower()
-            font_bold = any(
-                indicator in font_name 
-                for indicator in ['bold', 'black', 'heavy', 'semibold']
-            )
-            
-            if is_bold or font_bold:
-                bbox = block.get('bbox', [0, 0, 0, 0])
-                # Prefer blocks in upper portion
-                if bbox[1] < 200:  # Arbitrary upper threshold
-                    bold_blocks.append((bbox[1], block))
-        
-        if bold_blocks:
-            # Sort by vertical position
-            bold_blocks.sort(key=lambda x: x[0])
-            return bold_blocks[0][1]['text']
-        
-        return None
+        # Check for bold flag (16 in PyMuPDF flags)
+        is_bold = (flags & 16) != 0
+        
+        # Also check font name for bold indicators
+        font_bold = np.fromiter(
+            (any(indicator in font_name for indicator in ('bold', 'black', 'heavy', 'semibold'))
+             for font_name in fonts),
+            dtype=bool, count=len(fonts)
+        )
+        
+        # Prefer blocks in upper portion (arbitrary upper threshold)
+        return self._topmost((is_bold | font_bold) & (tops < 200), tops)
     
-    def _find_by_top_position(self, text_blocks: List[Dict[str, Any]]) -> Optional[str]:
+    def _find_by_top_position(self, sizes: np.ndarray, tops: np.ndarray) -> Optional[int]:
         """Find title by topmost position with reasonable font size."""
-        if not text_blocks:
-            return None
-        
-        # Filter blocks in top portion with decent font size
-        font_sizes = [block.get('size', 0) for block in text_blocks]
-        avg_font_size = sum(font_sizes) / len(font_sizes) if font_sizes else 12
-        
-        top_blocks = []
-        for block in text_blocks:
-            bbox = block.get('bbox', [0, 0, 0, 0])
-            font_size = block.get('size', 0)
-            
-            # Must be in top 20% and have above-average font size
-            if bbox[1] < 100 and font_size >= avg_font_size:
-                top_blocks.append((bbox[1], block))
-        
-        if top_blocks:
-            top_blocks.sort(key=lambda x: x[0])
-            return top_blocks[0][1]['text']
-        
-        return None
-    
-    def _select_best_candidate(self, candidates: List[tuple], text_blocks: List[Dict[str, Any]]) -> Optional[str]:
-        """Select the best title candidate using scoring."""
-        if not candidates:
-            return None
-        
-        scores = {}
-        
-        for strategy, text in candidates:
-            if text not in scores:
-                scores[text] = 0
-            
-            # Score based on strategy type
-            if strategy == 'font_size':
-                scores[text] += 3
-            elif strategy == 'position':
-                scores[text] += 2
-            elif strategy == 'style':
-                scores[text] += 2
-            elif strategy == 'top':
-                scores[text] += 1
-        
-        # Additional scoring based on text characteristics
-        for text in scores:
-            # Penalize very short or very long text
-            text_length = len(text.strip())
-            if 5 <= text_length <= 100:
-                scores[text] += 1
-            elif text_length > 200:
-                scores[text] -= 2
-            
-            # Bonus for title-like patterns
-            if self._looks_like_title(text):
-                scores[text] += 2
-        
-        # Return highest scoring candidate
-        if scores:
-            best_candidate = max(scores.items(), key=lambda x: x[1])
-            return best_candidate[0]
-        
-        return None
-    
-    def _looks_like_title(self, text: str) -> bool:
-        """Check if text looks like a title based on patterns."""
-        text = text.strip()
-        
-        # Check for title patterns
-        patterns = [
-            r'^[A-Z][a-z\s]+$',  # Starts with capital, contains words
-            r'^[A-Z\s]+$',       # All caps with spaces
-            r'^\w+(\s+\w+)*$'    # Multiple words
-        ]
-        
-        for pattern in patterns:
-            if re.match(pattern, text):
-                return True
-        
-        # Avoid common non-title patterns
-        avoid_patterns = [
-            r'^\d+$',            # Just numbers
-            r'^page\s+\d+',      # Page numbers
-            r'^chapter\s+\d+',   # Chapter numbers only
-            r'^www\.',           # URLs
-            r'@'                 # Email addresses
-        ]
-        
-        for pattern in avoid_patterns:
-            if re.search(pattern, text.lower()):
-                return False
+        # Plain sum() keeps the average bit-identical to the per-block loop
+        avg_font_size = sum(sizes.tolist()) / len(sizes)
         
-        return True
+        # Must be in top 20% and have above-average font size
+        return self._topmost((tops < 100) & (sizes >= avg_font_size), tops)
     
     def _clean_title(self, title: str) -> str:
         """Clean and format the extracted title."""
@@ -3,46 +3,138 @@ Utility Module
 Contains helper functions and utilities used across the application.
 """
 
+import os
 import re
 import time
 import logging
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Union
-from functools import wraps
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Union
+from functools import lru_cache, wraps
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 
 logger = logging.getLogger(__name__)
 
+# Control characters dropped by clean_text (keeps tab, newline, CR and NEL)
+_CTRL_TRANSLATE = dict.fromkeys(
+    [*range(0x00, 0x09), 0x0b, 0x0c, *range(0x0e, 0x20), *range(0x7f, 0x85), *range(0x86, 0xa0)]
+)
+
+# Text cleaning patterns, compiled once. Runs of three or more dots or
+# dashes are matched together and shortened to exactly three
+_PUNCT_RUN_RE = re.compile(r'([.-])\1{2,}')
+_NUM_RE = re.compile(r'\d+')
+
+# Language detection tables: every byte that is not an ASCII letter, and the
+# extended Latin code points (Latin-1 Supplement to Latin Extended-B, and
+# Latin Extended Additional)
+_NON_ASCII_LETTER_BYTES = bytes(
+    b for b in range(256) if not (0x41 <= b <= 0x5a or 0x61 <= b <= 0x7a)
+)
+_EXTENDED_LATIN_DELETE = dict.fromkeys([*range(0x00c0, 0x0250), *range(0x1e00, 0x1f00)])
+
+# Heading-like text patterns in one alternation: numbered headings, all caps,
+# title case, section markers
+_HEADING_RE = re.compile(
+    r'^(?:\d+\.?\s+\w+'
+    r'|[A-Z][A-Z\s]+$'
+    r'|[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*$'
+    r'|(?:Chapter|Section|Part|Appendix)\s+)'
+)
+
+# Font style keywords looked for in lowercased font names
+_FONT_BOLD_RE = re.compile(r'bold|black|heavy|semibold')
+_FONT_ITALIC_RE = re.compile(r'italic|oblique')
+_FONT_CONDENSED_RE = re.compile(r'condensed|narrow')
+_FONT_EXTENDED_RE = re.compile(r'extended|wide')
+
 
 def timing_decorator(func):
     """Decorator to measure function execution time."""
     @wraps(func)
     def wrapper(*args, **kwargs):
-        start_time = time.time()
-        result = func(*args, **kwargs)
-        end_time = time.time()
-        logger.debug(f"{func.__name__} executed in {end_time - start_time:.3f} seconds")
-        return result
+        start_time = time.perf_counter_ns()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("%s executed in %.3f seconds", func.__name__,
+                             (time.perf_counter_ns() - start_time) / 1e9)
     return wrapper
 
 
 def safe_file_operation(func):
-    """Decorator for safe file operations with error handling."""
+    """
+    Decorator for safe file operations with error handling.
+    
+    I/O and decoding failures are logged and turn into a None result;
+    anything else is a bug and propagates to the caller.
+    """
     @wraps(func)
     def wrapper(*args, **kwargs):
         try:
             return func(*args, **kwargs)
         except FileNotFoundError as e:
-            logger.error(f"File not found: {e}")
+            logger.error("File not found: %s", e)
             return None
         except PermissionError as e:
-            logger.error(f"Permission denied: {e}")
+            logger.error("Permission denied: %s", e)
             return None
-        except Exception as e:
-            logger.error(f"File operation failed: {e}")
+        except (OSError, UnicodeError) as e:
+            logger.error("File operation failed: %s", e)
             return None
     return wrapper
 
 
+@dataclass
+class Span:
+    """A run of text with uniform formatting, as extracted from a page."""
+    
+    __slots__ = ('text', 'font', 'size', 'flags', 'bbox', 'color', 'confidence')
+    
+    text: str
+    font: str
+    size: float
+    flags: int                   # Bold, italic flags (PyMuPDF bits)
+    bbox: Sequence[float]        # Bounding box (x0, y0, x1, y1)
+    color: int
+    confidence: Optional[int]    # OCR word confidence; None for native text
+
+
+def trim_fitz_store(pages_done: int, every: int) -> None:
+    """
+    Empty PyMuPDF's shared resource store after every `every` pages.
+    
+    The store keeps fonts, images and display lists of every page touched,
+    so on very long documents it is emptied periodically to keep memory flat.
+    Recent PyMuPDF no longer reports the store size, hence a page interval.
+    """
+    if every and pages_done % every == 0:
+        # Imported here so utils stays free of a PyMuPDF import for its other users
+        import fitz  # PyMuPDF
+        fitz.TOOLS.store_shrink(100)
+
+
+@lru_cache(maxsize=4096)
+def _is_likely_heading(text: str, max_length: int = 200) -> bool:
+    """Cached heading check; running headers and footers repeat on every page."""
+    if not text or len(text) > max_length:
+        return False
+    
+    # Every heading pattern starts with a digit or an ASCII capital
+    c0 = text[0]
+    if not ('A' <= c0 <= 'Z' or c0.isdecimal()):
+        return False
+    
+    # Count words
+    words = text.split()
+    if len(words) > 15:  # Too many words for a heading
+        return False
+    
+    # Check for heading-like patterns
+    return _HEADING_RE.match(text) is not None
+
+
 class TextProcessor:
     """Utility class for text processing operations."""
     
@@ -57,79 +149,76 @@ class TextProcessor:
         if not isinstance(text, str):
             return ""
         
-        # Remove control characters
-        text = re.sub(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f-\x84\x86-\x9f]', '', text)
-        
-        # Normalize whitespace
-        text = TextProcessor.normalize_whitespace(text)
+        # Remove control characters and normalize whitespace; split() also
+        # drops leading and trailing whitespace
+        text = ' '.join(text.translate(_CTRL_TRANSLATE).split())
         
-        # Remove excessive punctuation
-        text = re.sub(r'[.]{3,}', '...', text)
-        text = re.sub(r'[-]{3,}', '---', text)
+        # Remove excessive punctuation in one pass, only when there is any
+        if '...' in text or '---' in text:
+            text = _PUNCT_RUN_RE.sub(r'\1\1\1', text)
         
-        return text.strip()
+        return text
     
     @staticmethod
     def extract_numbers(text: str) -> List[int]:
         """Extract all numbers from text."""
-        return [int(match) for match in re.findall(r'\d+', text)]
+        return list(map(int, _NUM_RE.findall(text)))
     
     @staticmethod
     def is_likely_heading(text: str, max_length: int = 200) -> bool:
         """Determine if text is likely a heading based on characteristics."""
-        if not text or len(text) > max_length:
-            return False
-        
-        # Count words
-        words = text.split()
-        if len(words) > 15:  # Too many words for a heading
-            return False
-        
-        # Check for heading-like patterns
-        patterns = [
-            r'^\d+\.?\s+\w+',           # Numbered headings
-            r'^[A-Z][A-Z\s]+$',         # All caps
-            r'^[A-Z][a-z]+(\s+[A-Z][a-z]+)*$',  # Title case
-            r'^(Chapter|Section|Part|Appendix)\s+',  # Section markers
-        ]
-        
-        for pattern in patterns:
-            if re.match(pattern, text):
-                return True
-        
-        return False
+        return _is_likely_heading(text, max_length)
     
     @staticmethod
     def detect_language(text: str) -> str:
         """Simple language detection based on character patterns."""
-        if not text:
+        # Count non-space characters without building a space-stripped copy;
+        # empty or all-space text has no letters to classify
+        non_space_chars = len(text) - text.count(' ')
+        if non_space_chars == 0:
             return 'unknown'
         
-        # Count different script types
-        latin_chars = len(re.findall(r'[a-zA-Z]', text))
-        total_chars = len(re.findall(r'[a-zA-Z\u00C0-\u024F\u1E00-\u1EFF]', text))
-        
-        if latin_chars / max(len(text.replace(' ', '')), 1) > 0.7:
+        # Count ASCII letters in C: drop non-ASCII, then delete non-letter bytes
+        latin_chars = len(text.encode('ascii', 'ignore').translate(None, _NON_ASCII_LETTER_BYTES))
+        if latin_chars / non_space_chars > 0.7:
             return 'eng'
-        elif total_chars / max(len(text.replace(' ', '')), 1) > 0.5:
+        
+        # Extended Latin letters are only counted when needed
+        total_chars = latin_chars
+        if not text.isascii():
+            total_chars += len(text) - len(text.translate(_EXTENDED_LATIN_DELETE))
+        
+        if total_chars / non_space_chars > 0.5:
             return 'extended_latin'
         else:
             return 'unknown'
 
 
+@lru_cache(maxsize=256)
+def _font_styles(font_name: str) -> Tuple[bool, bool, bool, bool]:
+    """(bold, italic, condensed, extended) flags for a font name; documents reuse few fonts."""
+    font_lower = font_name.lower()
+    return (
+        _FONT_BOLD_RE.search(font_lower) is not None,
+        _FONT_ITALIC_RE.search(font_lower) is not None,
+        _FONT_CONDENSED_RE.search(font_lower) is not None,
+        _FONT_EXTENDED_RE.search(font_lower) is not None
+    )
+
+
 class FontAnalyzer:
     """Utility class for font analysis operations."""
     
     @staticmethod
     def extract_font_info(font_name: str) -> Dict[str, bool]:
         """Extract font style information from font name."""
-        font_lower = font_name.lower()
+        is_bold, is_italic, is_condensed, is_extended = _font_styles(font_name)
         
         return {
-            'is_bold': any(keyword in font_lower for keyword in ['bold', 'black', 'heavy', 'semibold']),
-            'is_italic': any(keyword in font_lower for keyword in ['italic', 'oblique']),
-            'is_condensed': any(keyword in font_lower for keyword in ['condensed', 'narrow']),
-            'is_extended': any(keyword in font_lower for keyword in ['extended', 'wide'])
+            'is_bold': is_bold,
+            'is_italic': is_italic,
+            'is_condensed': is_condensed,
+            'is_extended': is_extended
         }
     
     @staticmethod
@@ -151,16 +240,15 @@ class FontAnalyzer:
         sorted_sizes = sorted(set(font_sizes))
         groups = {}
         
+        # Sizes ascend, so a size can only fall within tolerance of the most
+        # recent group key: earlier keys are more than tolerance below it
+        anchor = None
         for size in sorted_sizes:
-            grouped = False
-            for group_key in groups:
-                if abs(size - group_key) <= tolerance:
-                    groups[group_key].append(size)
-                    grouped = True
-                    break
-            
-            if not grouped:
-                groups[size] = [size]
+            if anchor is None or size - anchor > tolerance:
+                anchor = size
+                groups[anchor] = [size]
+            else:
+                groups[anchor].append(size)
         
         return groups
 
@@ -194,14 +282,13 @@ class GeometryUtils:
         right = min(bbox1[2], bbox2[2])
         bottom = min(bbox1[3], bbox2[3])
         
-        if left >= right or top >= bottom:
-            return 0
-        
-        intersection_area = (right - left) * (bottom - top)
-        area1 = GeometryUtils.bbox_area(bbox1)
-        area2 = GeometryUtils.bbox_area(bbox2)
+        # Clamped extents: disjoint boxes give a zero intersection, no branch
+        intersection_area = max(0.0, right - left) * max(0.0, bottom - top)
+        area1 = (bbox1[2] - bbox1[0]) * (bbox1[3] - bbox1[1])
+        area2 = (bbox2[2] - bbox2[0]) * (bbox2[3] - bbox2[1])
+        min_area = area1 if area1 < area2 else area2
         
-        return intersection_area / min(area1, area2) if min(area1, area2) > 0 else 0
+        return intersection_area / min_area if min_area > 0 else 0
     
     @staticmethod
     def is_approximately_centered(bbox: List[float], page_width: float, tolerance: float = 0.2) -> bool:
@@ -224,8 +311,8 @@ def read_file_safely(file_path: Union[str, Path]) -> Optional[str]:
 
 
 @safe_file_operation
-def write_file_safely(file_path: Union[str, Path], content: str) -> bool:
-    """Safely write content to text file."""
+def write_file_safely(file_path: Union[str, Path], content: str) -> Optional[bool]:
+    """Safely write content to text file; None on failure, like read_file_safely."""
     Path(file_path).parent.mkdir(parents=True, exist_ok=True)
     with open(file_path, 'w', encoding='utf-8') as f:
         f.write(content)
@@ -234,36 +321,72 @@ def write_file_safely(file_path: Union[str, Path], content: str) -> bool:
 
 def validate_pdf_file(file_path: Path) -> bool:
     """Validate if file is a proper PDF."""
-    if not file_path.exists():
+    # Exact-case endings short-circuit; mixed case like '.Pdf' still passes
+    name = file_path.name
+    if len(name) <= 4 or not (name.endswith(('.pdf', '.PDF')) or name[-4:].lower() == '.pdf'):
         return False
     
-    if not file_path.suffix.lower() == '.pdf':
-        return False
-    
-    # Check file size
+    # One stat call covers both existence and size
     try:
-        file_size = file_path.stat().st_size
-        if file_size == 0:
+        if os.stat(file_path).st_size == 0:
             return False
         
-        # Basic PDF header check
-        with open(file_path, 'rb') as f:
-            header = f.read(5)
-            if not header.startswith(b'%PDF-'):
-                return False
-        
-        return True
+        return _has_pdf_header(file_path)
         
     except Exception:
         return False
 
 
+def _has_pdf_header(path: Union[str, Path]) -> bool:
+    """Basic PDF header check on a raw descriptor; no buffered file object."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        return os.read(fd, 5) == b'%PDF-'
+    finally:
+        os.close(fd)
+
+
+def _has_pdf_header_safely(path: str) -> bool:
+    """Header check for pool workers; unreadable files count as invalid."""
+    try:
+        return _has_pdf_header(path)
+    except OSError:
+        return False
+
+
+def validate_pdf_directory(directory: Union[str, Path], max_workers: int = 8) -> List[Path]:
+    """
+    Return the valid PDF files in a directory, in directory order.
+    
+    Suffix and size are checked on the scandir entries, so only non-empty
+    candidates are opened, and their header reads overlap on a thread pool.
+    """
+    candidates = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            name = entry.name
+            if len(name) <= 4 or name[-4:].lower() != '.pdf':
+                continue
+            try:
+                if entry.is_file() and entry.stat().st_size > 0:
+                    candidates.append(entry.path)
+            except OSError:
+                continue
+    
+    if not candidates:
+        return []
+    
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(candidates))) as executor:
+        valid = list(executor.map(_has_pdf_header_safely, candidates))
+    
+    return [Path(path) for path, ok in zip(candidates, valid) if ok]
+
+
 def format_processing_stats(stats: Dict[str, Any]) -> str:
     """Format processing statistics for logging."""
-    return (
-        f"Processing Stats - "
-        f"Files: {stats.get('files_processed', 0)}, "
-        f"Total Time: {stats.get('total_time', 0):.2f}s, "
-        f"Avg Time: {stats.get('avg_time', 0):.2f}s, "
-        f"Headings: {stats.get('total_headings', 0)}"
+    return "Processing Stats - Files: %s, Total Time: %.2fs, Avg Time: %.2fs, Headings: %s" % (
+        stats.get('files_processed', 0),
+        stats.get('total_time', 0),
+        stats.get('avg_time', 0),
+        stats.get('total_headings', 0),
     )